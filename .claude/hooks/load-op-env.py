@@ -4,8 +4,6 @@
 # requires-python = ">=3.12"
 # dependencies = [
 #     "pydantic>=2.10",
-#     "pydantic-settings>=2.6",
-#     "python-dotenv>=1.0",
 # ]
 # [tool.uv]
 # exclude-newer = "2025-12-02T00:00:00Z"
@@ -17,6 +15,10 @@ This hook resolves 1Password secret references from .op.env and persists them
 to CLAUDE_ENV_FILE, making secrets available to all subsequent bash commands
 without requiring `poe op-run` prefix.
 
+Resolved secrets are cached next to CLAUDE_ENV_FILE (mode 0600), keyed by the
+content hash and mtime of .op.env, so resumed and compacted sessions skip the
+1Password CLI entirely while .op.env is unchanged.
+
 Usage:
     # As a Claude Code hook (configured in .claude/settings.json):
     # Receives JSON on stdin, outputs JSON to stdout
@@ -42,11 +44,16 @@ References:
 
 from __future__ import annotations
 
-import io
+import functools
+import hashlib
 import json
+import os
+import re
 import shutil
 import subprocess
 import sys
+import time
+from collections.abc import Iterator
 from pathlib import Path
 from typing import (
     Annotated,
@@ -54,11 +61,11 @@ from typing import (
     Generic,
     Literal,
     LiteralString,
+    Self,
     TypeAlias,
     TypeVar,
 )
 
-import dotenv
 from pydantic import (
     BaseModel,
     ConfigDict,
@@ -66,11 +73,25 @@ from pydantic import (
     Field,
     GetPydanticSchema,
     NewPath,
+    TypeAdapter,
 )
 from pydantic.alias_generators import to_camel
-from pydantic_settings import BaseSettings, SettingsConfigDict
 
 OP_ENV_FILENAME: Final = ".op.env"
+OP_CACHE_SUFFIX: Final = ".opcache.json"
+
+# Upper bound on a single `op inject` run
+OP_INJECT_TIMEOUT_SECONDS: Final = 60
+
+# Skip re-running the hook if CLAUDE_ENV_FILE was written this recently
+ENV_FILE_DEBOUNCE_SECONDS: Final = 30
+
+# Substrings of `op inject` stderr that indicate the CLI is not signed in
+OP_UNAUTHENTICATED_MARKERS: Final = (
+    "not currently signed in",
+    "no account",
+    "not signed in",
+)
 
 
 # =============================================================================
@@ -78,10 +99,11 @@ OP_ENV_FILENAME: Final = ".op.env"
 # =============================================================================
 
 
-class CommonHookSettings(BaseSettings):
-    """Environment variables available to all Claude Code hooks."""
+class CommonHookSettings(BaseModel):
+    """Environment variables available to all Claude Code hooks.
 
-    model_config = SettingsConfigDict(env_prefix="CLAUDE_")
+    Validated directly from `os.environ` (see `from_environ`).
+    """
 
     code_remote: bool = Field(default=False, alias="CLAUDE_CODE_REMOTE")
     """Whether the hook is running in a remote (web) environment."""
@@ -92,6 +114,11 @@ class CommonHookSettings(BaseSettings):
     project_dir: DirectoryPath = Field(alias="CLAUDE_PROJECT_DIR")
     """Absolute path to the project root directory (where Claude Code was started)."""
 
+    @classmethod
+    def from_environ(cls) -> Self:
+        """Load settings from the current process environment."""
+        return cls.model_validate(dict(os.environ))
+
 
 class SessionStartHookSettings(CommonHookSettings):
     """Environment variables specific to SessionStart hooks."""
@@ -203,6 +230,16 @@ class SessionStartOutput(CommonHookOutput):
     )
 
 
+# Built once at import time so validation/serialization reuse the same core schema
+_INPUT_ADAPTER: Final = TypeAdapter(SessionStartHookInput)
+_OUTPUT_ADAPTER: Final = TypeAdapter(SessionStartOutput)
+
+
+def dump_output(output: SessionStartOutput) -> str:
+    """Serialize hook output to the JSON Claude Code expects on stdout."""
+    return _OUTPUT_ADAPTER.dump_json(output, by_alias=True, exclude_none=True).decode()
+
+
 # =============================================================================
 # Core Logic
 # =============================================================================
@@ -214,6 +251,118 @@ class OpCliError(Exception):
     pass
 
 
+# One `[export ]KEY=VALUE` statement. Quoted values may span lines. Single-quoted
+# values are tried as shell quoting first (including the `'\''` idiom written by
+# `_shell_quote`), then with dotenv's `\'` / `\\` escapes.
+_ENV_BINDING_RE: Final = re.compile(
+    r"""
+    [ \t]*(?:export[ \t]+)?(?P<key>[A-Za-z_][A-Za-z0-9_]*)[ \t]*=[ \t]*
+    (?:
+        '(?P<sq_shell>[^']*)'(?P<sq_shell_rest>(?:\\''[^']*')*)[ \t]*(?:\#[^\r\n]*)?
+      | '(?P<sq>(?:\\[\s\S]|[^'\\])*)'[ \t]*(?:\#[^\r\n]*)?
+      | "(?P<dq>(?:\\[\s\S]|[^"\\])*)"[ \t]*(?:\#[^\r\n]*)?
+      | (?P<unquoted>(?:[^'"\r\n][^\r\n]*)?)
+    )
+    (?=\r?\n|\Z)
+    """,
+    re.VERBOSE,
+)
+
+# Start of something that claims to be an assignment, used to report bad ones
+_ENV_ASSIGNMENT_RE: Final = re.compile(r"[ \t]*(?:export[ \t]+)?[A-Za-z_]\w*[ \t]*=")
+
+_DOUBLE_QUOTE_ESCAPES: Final = {
+    "\\": "\\",
+    "'": "'",
+    '"': '"',
+    "a": "\a",
+    "b": "\b",
+    "f": "\f",
+    "n": "\n",
+    "r": "\r",
+    "t": "\t",
+    "v": "\v",
+}
+
+
+def _decode_env_value(match: re.Match[str]) -> str:
+    """Decode the value of an `_ENV_BINDING_RE` match."""
+    if (value := match["sq_shell"]) is not None:
+        rest = re.findall(r"\\''([^']*)'", match["sq_shell_rest"])
+        return value + "".join("'" + segment for segment in rest)
+    if (value := match["sq"]) is not None:
+        return re.sub(r"\\([\\'])", r"\1", value)
+    if (value := match["dq"]) is not None:
+        return re.sub(
+            r"\\([\\'\"abfnrtv])", lambda m: _DOUBLE_QUOTE_ESCAPES[m[1]], value
+        )
+    # Unquoted: drop a trailing ` #...` comment, keep backslashes as-is
+    return re.sub(r"\s+#.*", "", match["unquoted"]).rstrip()
+
+
+def _iter_env_statements(text: str) -> Iterator[tuple[str | None, str | None, str]]:
+    """Split env file text into statements.
+
+    Yields:
+        `(key, value, source)` per statement, where `source` is the statement's
+        original text including its line ending. `key` and `value` are None for
+        blank lines, comments, and anything that isn't a parseable assignment
+        (e.g. `source ...` lines or an unterminated quoted value).
+    """
+    pos = 0
+    while pos < len(text):
+        match = _ENV_BINDING_RE.match(text, pos)
+        if match:
+            key, value, end = match["key"], _decode_env_value(match), match.end()
+        else:
+            key, value = None, None
+            end = text.find("\n", pos)
+            end = len(text) if end == -1 else end
+
+        # Include the line ending in the statement
+        if text.startswith("\r\n", end):
+            end += 2
+        elif text.startswith("\n", end):
+            end += 1
+
+        yield key, value, text[pos:end]
+        pos = end
+
+
+def parse_env_text(text: str) -> dict[str, str]:
+    """Parse dotenv-style `KEY=VALUE` text into a dict.
+
+    Handles an optional `export ` prefix, `#` comments, and quoted values that
+    span multiple lines (e.g. PEM keys from `op inject`). Double-quoted values
+    decode dotenv's backslash escapes; unquoted values keep backslashes. A
+    malformed assignment is reported on stderr and skipped as a whole, so none of
+    its continuation lines are mistaken for variables.
+
+    Args:
+        text: Contents of a dotenv/shell env file.
+
+    Returns:
+        Dictionary of variable names to values.
+    """
+    values: dict[str, str] = {}
+    line_number = 1
+    for key, value, source in _iter_env_statements(text):
+        if key is not None and value is not None:
+            values[key] = value
+        elif _ENV_ASSIGNMENT_RE.match(source):
+            # Don't echo the line itself - it may hold secret material
+            message = f"skipping unparseable assignment on line {line_number}"
+            print(f"load-op-env.py: {message}", file=sys.stderr)
+        line_number += source.count("\n")
+    return values
+
+
+@functools.lru_cache(maxsize=1)
+def _find_op(path_env: str) -> str:
+    """Locate the op executable on the given PATH, memoized per PATH value."""
+    return shutil.which("op", path=path_env) or ""
+
+
 def check_op_cli_available() -> Path:
     """Check if 1Password CLI is available on PATH.
 
@@ -223,36 +372,12 @@ def check_op_cli_available() -> Path:
     Raises:
         OpCliError: If op CLI is not found.
     """
-    op_path = shutil.which("op")
-    if op_path is None:
+    op_path = _find_op(os.environ.get("PATH", os.defpath))
+    if not op_path:
         raise OpCliError("1Password CLI (op) not found on PATH")
     return Path(op_path)
 
 
-def check_op_cli_authenticated(op_path: Path) -> None:
-    """Check if 1Password CLI is authenticated.
-
-    Raises:
-        OpCliError: If op CLI is not authenticated.
-    """
-    result = subprocess.run(
-        [str(op_path), "account", "list", "--format=json"],
-        capture_output=True,
-        encoding="utf-8",
-        timeout=10,
-    )
-    if result.returncode != 0:
-        raise OpCliError(f"1Password CLI not authenticated: {result.stderr.strip()}")
-
-    # Check if any accounts are returned
-    try:
-        accounts = json.loads(result.stdout)
-        if not accounts:
-            raise OpCliError("No 1Password accounts configured. Run 'op signin' first.")
-    except json.JSONDecodeError:
-        raise OpCliError(f"Failed to parse op account list output: {result.stdout}")
-
-
 def inject_op_secrets(op_path: Path, op_env_file: Path) -> dict[str, str]:
     """Use 1Password CLI to resolve secret references and return as dict.
 
@@ -264,24 +389,114 @@ def inject_op_secrets(op_path: Path, op_env_file: Path) -> dict[str, str]:
         Dictionary of environment variable names to resolved values.
 
     Raises:
-        OpCliError: If injection fails.
+        OpCliError: If injection fails, including when op is not signed in.
     """
+    # op inject emits its output in one go, so capture it and let run() drain
+    # stdout and stderr together (no pipe deadlock) and enforce the timeout
     result = subprocess.run(
         [str(op_path), "inject", "--in-file", str(op_env_file)],
         capture_output=True,
         encoding="utf-8",
-        timeout=60,
+        timeout=OP_INJECT_TIMEOUT_SECONDS,
     )
+    stderr = result.stderr.strip()
 
     if result.returncode != 0:
-        raise OpCliError(f"Failed to inject secrets: {result.stderr.strip()}")
+        if any(marker in stderr.lower() for marker in OP_UNAUTHENTICATED_MARKERS):
+            raise OpCliError(
+                f"1Password CLI not authenticated — run 'op signin' ({stderr})"
+            )
+        raise OpCliError(f"Failed to inject secrets: {stderr}")
 
-    # Parse the injected output as a dotenv stream
-    stream = io.StringIO(result.stdout)
-    secrets = dotenv.dotenv_values(stream=stream)
+    # Parse the injected output as KEY=VALUE lines
+    return parse_env_text(result.stdout)
 
-    # Filter out None values and return
-    return {k: v for k, v in secrets.items() if v is not None}
+
+def op_env_cache_key(op_env_file: Path) -> str:
+    """Compute a cache key for the resolved secrets of an .op.env file.
+
+    Args:
+        op_env_file: Path to the .op.env file with op:// references.
+
+    Returns:
+        Content hash combined with the file's modification time.
+    """
+    digest = hashlib.blake2b(op_env_file.read_bytes(), digest_size=16).hexdigest()
+    return f"{digest}-{op_env_file.stat().st_mtime_ns}"
+
+
+def load_cached_secrets(cache_file: Path, key: str) -> dict[str, str] | None:
+    """Load previously resolved secrets if the cache matches the current .op.env.
+
+    Args:
+        cache_file: Path to the secrets cache (next to CLAUDE_ENV_FILE).
+        key: Cache key from `op_env_cache_key`.
+
+    Returns:
+        Cached secrets, or None if the cache is missing, unreadable, malformed,
+        or stale.
+    """
+    try:
+        data = json.loads(cache_file.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+
+    if not isinstance(data, dict) or data.get("key") != key:
+        return None
+    secrets = data.get("secrets")
+    if not isinstance(secrets, dict) or not all(
+        isinstance(k, str) and isinstance(v, str) for k, v in secrets.items()
+    ):
+        return None
+    return secrets
+
+
+def write_cached_secrets(cache_file: Path, key: str, secrets: dict[str, str]) -> None:
+    """Persist resolved secrets so unchanged .op.env files skip `op inject`.
+
+    Args:
+        cache_file: Path to the secrets cache (next to CLAUDE_ENV_FILE).
+        key: Cache key from `op_env_cache_key`.
+        secrets: Dictionary of resolved secrets.
+    """
+    fd = os.open(cache_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump({"key": key, "secrets": secrets}, f)
+    # Tighten permissions in case the file already existed
+    cache_file.chmod(0o600)
+
+
+def env_file_is_fresh(env_file: Path, op_env_file: Path, session_id: str) -> bool:
+    """Check whether CLAUDE_ENV_FILE was just written for this session.
+
+    Guards against bursts of SessionStart events (e.g. repeated /compact) redoing
+    the 1Password round-trip and rewriting the env file.
+
+    Args:
+        env_file: Path to CLAUDE_ENV_FILE.
+        op_env_file: Path to the .op.env file with op:// references.
+        session_id: Current session ID from the hook input.
+
+    Returns:
+        True if the env file is recent, newer than .op.env, and already holds
+        every .op.env variable for this session.
+    """
+    try:
+        env_mtime = env_file.stat().st_mtime
+        if not 0 <= time.time() - env_mtime <= ENV_FILE_DEBOUNCE_SECONDS:
+            return False
+        if op_env_file.stat().st_mtime > env_mtime:
+            return False
+
+        current = parse_env_text(env_file.read_text(encoding="utf-8"))
+        expected = parse_env_text(op_env_file.read_text(encoding="utf-8"))
+    except OSError:
+        return False
+
+    return (
+        current.get("X_CLAUDE_SESSION_ID") == session_id
+        and expected.keys() <= current.keys()
+    )
 
 
 def ensure_env_file_exists(env_file: Path) -> None:
@@ -297,31 +512,51 @@ def ensure_env_file_exists(env_file: Path) -> None:
         env_file.chmod(0o700)
 
 
+def _shell_quote(value: str) -> str:
+    """Quote a value for a POSIX shell `export` line.
+
+    Wraps the value in single quotes and escapes embedded single quotes as `'\\''`.
+    """
+    return "'" + value.replace("'", "'\\''") + "'"
+
+
 def merge_and_write_env(
     env_file: Path, secrets: dict[str, str], additional_vars: dict[str, str]
 ) -> None:
     """Merge secrets with existing env file and write back.
 
+    Assignments to keys being set are replaced in place, every other statement
+    (comments, `source`/`eval` lines from other hooks, unrelated variables including
+    multi-line quoted values) is kept verbatim, and new keys are appended. The
+    result is written with a single write, rather than re-reading and rewriting
+    the file once per key.
+
     Args:
         env_file: Path to CLAUDE_ENV_FILE.
         secrets: Dictionary of secrets to write.
+        additional_vars: Extra variables to write alongside the secrets.
     """
-    # Load existing variables from CLAUDE_ENV_FILE
-    existing = dotenv.dotenv_values(dotenv_path=env_file)
-
-    # Merge: secrets take precedence over existing
-    merged = {**existing, **secrets, **additional_vars}
-
-    # Write each variable using dotenv.set_key (handles escaping properly)
-    for key, value in merged.items():
-        if value is not None:
-            dotenv.set_key(
-                dotenv_path=env_file,
-                key_to_set=key,
-                value_to_set=value,
-                quote_mode="auto",
-                export=True,
-            )
+    # Secrets and additional vars take precedence over existing values
+    updates = {**secrets, **additional_vars}
+    pending = dict(updates)
+
+    # Walk whole statements so lines inside another hook's multi-line quoted
+    # value are never mistaken for assignments
+    text = env_file.read_text(encoding="utf-8")
+    parts: list[str] = []
+    for key, _value, source in _iter_env_statements(text):
+        if key is not None and key in updates:
+            parts.append(f"export {key}={_shell_quote(updates[key])}\n")
+            pending.pop(key, None)
+        else:
+            parts.append(source)
+
+    if parts and not parts[-1].endswith("\n"):
+        parts[-1] += "\n"
+    parts.extend(
+        f"export {key}={_shell_quote(value)}\n" for key, value in pending.items()
+    )
+    env_file.write_text("".join(parts), encoding="utf-8")
 
 
 def run_hook(
@@ -342,19 +577,34 @@ def run_hook(
     if not op_env_path.exists():
         return None
 
+    env_file = Path(settings.env_file)
+    if env_file_is_fresh(env_file, op_env_path, hook_input.session_id):
+        return None
+
+    cache_file = env_file.with_suffix(OP_CACHE_SUFFIX)
+    cache_key = op_env_cache_key(op_env_path)
+
     try:
-        # Check 1Password CLI availability and authentication
-        op_path = check_op_cli_available()
-        check_op_cli_authenticated(op_path)
+        # Reuse secrets resolved for an unchanged .op.env
+        secrets = load_cached_secrets(cache_file, cache_key)
+
+        if secrets is None:
+            # Check 1Password CLI availability
+            op_path = check_op_cli_available()
+
+            # Inject secrets from .op.env (fails with an auth error if signed out)
+            secrets = inject_op_secrets(op_path, op_env_path)
 
-        # Inject secrets from .op.env
-        secrets = inject_op_secrets(op_path, op_env_path)
+            # Caching is best-effort; the env file can still be written without it
+            try:
+                write_cached_secrets(cache_file, cache_key, secrets)
+            except OSError:
+                pass
 
         if not secrets:
             return None
 
         # Ensure CLAUDE_ENV_FILE exists with proper permissions
-        env_file = Path(settings.env_file)
         ensure_env_file_exists(env_file)
 
         # Merge and write environment variables
@@ -376,26 +626,26 @@ def run_hook(
 def main() -> None:
     """Main entry point for the hook."""
     try:
-        # Parse hook input from stdin
-        raw_input = sys.stdin.read()
-        hook_input = SessionStartHookInput.model_validate_json(raw_input)
+        # Parse hook input from stdin (raw bytes go straight to the JSON parser)
+        raw_input = sys.stdin.buffer.read()
+        hook_input = _INPUT_ADAPTER.validate_json(raw_input)
 
         # Load settings from environment
-        settings = SessionStartHookSettings()  # type: ignore[call-arg]
+        settings = SessionStartHookSettings.from_environ()
 
         # Execute hook logic
         error_message = run_hook(hook_input, settings)
 
         # Construct output - silent on success, system_message on error
         output = SessionStartOutput(system_message=error_message)
-        print(output.model_dump_json(by_alias=True, exclude_none=True))
+        print(dump_output(output))
 
     except Exception as e:
         # On any error, output a valid JSON response that doesn't block the session
         output = SessionStartOutput(
             system_message=f"load-op-env.py error: {type(e).__name__}: {e}"
         )
-        print(output.model_dump_json(by_alias=True, exclude_none=True))
+        print(dump_output(output))
         sys.exit(0)  # Exit cleanly so we don't block Claude Code
 
 
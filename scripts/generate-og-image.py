@@ -3,6 +3,7 @@
 # /// script
 # requires-python = ">=3.12"
 # dependencies = [
+#     "cairosvg",
 #     "pillow",
 #     "typer",
 # ]
@@ -15,7 +16,7 @@ Generate Open Graph image for rae marketing site.
 Creates a 1200x630 PNG suitable for social media link previews,
 using the official rae-logo.svg centered with minimal padding.
 
-Requires: rsvg-convert (brew install librsvg)
+Requires: the cairo library used by CairoSVG (brew install cairo)
 
 Usage:
     ./scripts/generate-og-image.py
@@ -31,7 +32,10 @@ References:
     - uv scripts: https://docs.astral.sh/uv/guides/scripts/
 """
 
-import subprocess
+import functools
+import hashlib
+import io
+import os
 import tempfile
 from pathlib import Path
 
@@ -42,6 +46,22 @@ from PIL import Image
 BACKGROUND = (253, 251, 247)  # Warm white #fdfbf7
 PRIMARY_HEX = "#c4933d"  # Solar gold
 
+# Rendered logo PNGs, keyed by size, color and (modified) SVG content
+LOGO_CACHE_DIR = Path(".cache")
+
+
+@functools.lru_cache(maxsize=4)
+def _load_modified_svg(svg_path_str: str, mtime_ns: int, primary_hex: str) -> str:
+    """Read the logo SVG and apply brand color; memoized per path/mtime/color."""
+    svg_content = Path(svg_path_str).read_text()
+
+    # Replace currentColor with brand gold, remove white background rect
+    svg_modified = svg_content.replace("currentColor", primary_hex)
+    return svg_modified.replace(
+        '<rect width="400" height="280" fill="white" rx="20" ry="20"/>',
+        "",
+    )
+
 
 def main(
     output: Path = Path("public/images/og-default.png"),
@@ -49,8 +69,8 @@ def main(
     height: int = 630,
 ) -> None:
     """Generate the OG image using the official SVG logo."""
-    # Create base image with warm background
-    img = Image.new("RGB", (width, height), BACKGROUND)
+    # Create base image with warm background (RGBA for alpha_composite)
+    img = Image.new("RGBA", (width, height), BACKGROUND + (255,))
 
     # Load the official SVG logo
     svg_path = Path("public/images/rae-logo.svg")
@@ -58,13 +78,8 @@ def main(
         typer.echo(f"Error: {svg_path} not found", err=True)
         raise typer.Exit(1)
 
-    svg_content = svg_path.read_text()
-
-    # Replace currentColor with brand gold, remove white background rect
-    svg_modified = svg_content.replace("currentColor", PRIMARY_HEX)
-    svg_modified = svg_modified.replace(
-        '<rect width="400" height="280" fill="white" rx="20" ry="20"/>',
-        "",
+    svg_modified = _load_modified_svg(
+        str(svg_path), svg_path.stat().st_mtime_ns, PRIMARY_HEX
     )
 
     # Scale logo larger than canvas to crop out SVG's built-in padding
@@ -72,55 +87,67 @@ def main(
     # Original SVG is 400x280, maintain aspect ratio
     logo_width = int(logo_height * (400 / 280))
 
-    # Write modified SVG to temp file and convert with rsvg-convert
-    with tempfile.NamedTemporaryFile(
-        mode="w", suffix=".svg", delete=False
-    ) as svg_file:
-        svg_file.write(svg_modified)
-        svg_temp_path = svg_file.name
-
-    with tempfile.NamedTemporaryFile(suffix=".png", delete=False) as png_file:
-        png_temp_path = png_file.name
-
-    try:
-        # Use rsvg-convert (from librsvg) to render SVG to PNG
-        result = subprocess.run(
-            [
-                "rsvg-convert",
-                "-w",
-                str(logo_width),
-                "-h",
-                str(logo_height),
-                "-o",
-                png_temp_path,
-                svg_temp_path,
-            ],
-            capture_output=True,
-            text=True,
-            check=False,
-        )
-        if result.returncode != 0:
-            typer.echo(f"Error running rsvg-convert: {result.stderr}", err=True)
-            typer.echo("Install with: brew install librsvg", err=True)
+    # Reuse a previously rendered logo when size, color and SVG are unchanged
+    svg_hash = hashlib.md5(svg_modified.encode("utf-8")).hexdigest()[:8]
+    cache_key = f"{logo_width}x{logo_height}-{PRIMARY_HEX.lstrip('#')}-{svg_hash}"
+    cache_path = LOGO_CACHE_DIR / f"og-logo-{cache_key}.png"
+
+    logo: Image.Image | None = None
+    if cache_path.exists():
+        try:
+            with Image.open(cache_path) as cached:
+                logo = cached.convert("RGBA")
+        except OSError:
+            # Truncated or corrupt cache entry - treat as a miss and re-render
+            logo = None
+
+    if logo is None:
+        # CairoSVG loads the cairo shared library at import time
+        try:
+            import cairosvg
+        except OSError as e:
+            typer.echo(f"Error loading CairoSVG: {e}", err=True)
+            typer.echo("Install cairo with: brew install cairo", err=True)
             raise typer.Exit(1)
 
-        # Open rendered logo
-        logo = Image.open(png_temp_path).convert("RGBA")
-
-        # Center both horizontally and vertically
-        x = (width - logo_width) // 2
-        y = (height - logo_height) // 2
-
-        img.paste(logo, (x, y), logo)
-
-    finally:
-        # Clean up temp files
-        Path(svg_temp_path).unlink(missing_ok=True)
-        Path(png_temp_path).unlink(missing_ok=True)
+        # Render modified SVG to PNG in-process with CairoSVG
+        png_bytes = cairosvg.svg2png(
+            bytestring=svg_modified.encode("utf-8"),
+            output_width=logo_width,
+            output_height=logo_height,
+        )
+        # Write to a temp file and rename so an interrupted run can't leave a
+        # partial PNG at cache_path. Caching is best-effort: the logo is already
+        # rendered, so a read-only checkout or full disk shouldn't fail the run.
+        tmp_path: Path | None = None
+        try:
+            cache_path.parent.mkdir(parents=True, exist_ok=True)
+            with tempfile.NamedTemporaryFile(
+                dir=cache_path.parent, suffix=".tmp", delete=False
+            ) as tmp_file:
+                tmp_path = Path(tmp_file.name)
+                tmp_file.write(png_bytes)
+            os.replace(tmp_path, cache_path)
+        except OSError as e:
+            typer.echo(f"Warning: could not cache rendered logo: {e}", err=True)
+            if tmp_path is not None:
+                tmp_path.unlink(missing_ok=True)
+        logo = Image.open(io.BytesIO(png_bytes)).convert("RGBA")
+
+    # Center both horizontally and vertically
+    x = (width - logo_width) // 2
+    y = (height - logo_height) // 2
+
+    # Place logo on a transparent layer (offsets may be negative), then blend
+    # it over the background in one alpha_composite pass
+    layer = Image.new("RGBA", (width, height), (0, 0, 0, 0))
+    layer.paste(logo, (x, y))
+    img = Image.alpha_composite(img, layer).convert("RGB")
 
     # Save
     output.parent.mkdir(parents=True, exist_ok=True)
-    img.save(output, "PNG", optimize=True)
+    # Fixed zlib level: much faster than optimize=True for a slightly larger file
+    img.save(output, "PNG", compress_level=6)
     typer.echo(f"Generated OG image: {output}")
 
 